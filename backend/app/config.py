@@ -6,7 +6,11 @@ DATA_DIR = BASE_DIR / "data"
 UPLOAD_DIR = DATA_DIR / "uploads"
 VECTOR_STORE_DIR = DATA_DIR / "vector_store"
 FEEDBACK_VECTOR_DIR = DATA_DIR / "feedback_vector_store"
-FEEDBACK_LOG_PATH = DATA_DIR / "feedback_log.json"
+FEEDBACK_DB_PATH = DATA_DIR / "feedback.db"
+LEGACY_FEEDBACK_LOG_PATHS = (
+    DATA_DIR / "feedback_log.json",
+    DATA_DIR / "feedback_log.jsonl",
+)
 ENV_PATH = BASE_DIR / ".env"
 
 ROLE_WEIGHTS: Dict[str, int] = {
@@ -1,13 +1,21 @@
+import asyncio
+import hashlib
 import os
-from typing import List
+from functools import cached_property, lru_cache
+from pathlib import Path
+from typing import List, Tuple
 
+import httpx
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, File, HTTPException, UploadFile
+from fastapi import Depends, FastAPI, File, HTTPException, Request, UploadFile
 from fastapi.staticfiles import StaticFiles  # NEW: Import for static serving
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from langchain_community.vectorstores import FAISS
-from openai import OpenAI
-from starlette.responses import FileResponse  # NEW: For SPA fallback
+from langchain_core.documents import Document
+from openai import AsyncOpenAI
+from starlette.responses import Response  # NEW: For SPA fallback
 
 from . import config
 from .models import (
@@ -20,33 +28,90 @@ from .models import (
     UploadResponse,
 )
 from .services import documents, feedback as feedback_service, prompt_builder, vector_store
-from .services.embeddings import get_embedding_model
+from .services.embeddings import embed_texts
 
 load_dotenv(dotenv_path=config.ENV_PATH)
 
 config.ensure_directories()
 
-app = FastAPI(title="RAG Feedback Loop API")
+
+def _create_openai_client() -> AsyncOpenAI | None:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    return AsyncOpenAI(
+        api_key=api_key,
+        http_client=httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=20)),
+    )
+
+
+# Shared across requests so keep-alive connections to the API are reused.
+_openai_client = _create_openai_client()
+
+app = FastAPI(title="RAG Feedback Loop API", default_response_class=ORJSONResponse)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+# Starlette wraps each newly added middleware around the existing stack, so keep CORS as
+# the last one added: it then runs outermost and rejects disallowed origins before any
+# other middleware does work.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=config.ALLOWED_ORIGINS,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
     allow_credentials=True,
+    max_age=86400,
 )
 
+
+class CachedStaticFiles(StaticFiles):
+    """Static files where Vite's content-hashed assets are cached by browsers indefinitely."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if os.path.basename(os.path.dirname(full_path)) == "assets":
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
 # NEW: Conditional static mount for prod (assets like JS/CSS)
 if os.getenv("ENV") == "production":
     static_path = os.path.join(os.path.dirname(__file__), "..", "static")  # Relative to backend/static
-    app.mount("/static", StaticFiles(directory=static_path), name="static")
+    app.mount("/static", CachedStaticFiles(directory=static_path), name="static")
 
 class Stores:
+    """Lazily loaded stores so each index is only read when a route needs it."""
+
     def __init__(self) -> None:
-        self.document_store = vector_store.load_document_store()
-        self.feedback_repository = feedback_service.FeedbackRepository()
+        # Bumped on every document upload so cached search results are never served stale.
+        self.version = 0
+        self.cached_documents_context = lru_cache(maxsize=256)(self._documents_context)
+
+    @cached_property
+    def document_store(self) -> FAISS | None:
+        return vector_store.load_document_store_cached()
+
+    @cached_property
+    def feedback_repository(self) -> feedback_service.FeedbackRepository:
+        return feedback_service.FeedbackRepository()
+
+    def _documents_context(self, query: str, version: int) -> Tuple[SourceDocument, ...]:
+        if self.document_store is None:
+            return ()
+        results = self.document_store.similarity_search_with_score(query, k=5)
+        return tuple(
+            SourceDocument(
+                source=doc.metadata.get("source"),
+                content=doc.page_content,
+                score=float(vector_store.similarity(self.document_store, score)),
+            )
+            for doc, score in results
+        )
 
 
+# Constructing Stores is cheap (its stores load on first access), so a single module-level
+# instance is shared by every request instead of racing to build one per worker thread.
 stores_dependency = Stores()
+_document_store_lock = asyncio.Lock()
 
 
 def get_stores() -> Stores:
@@ -61,62 +126,69 @@ async def upload_documents(
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
 
-    embeddings = get_embedding_model()
-    document_store = stores.document_store
-    added_chunks = 0
-    processed_files: List[str] = []
-
-    for file in files:
-        data = await file.read()
-        stored_path = documents.store_upload(file.filename, data)
+    async def process_one(file: UploadFile) -> List[Document]:
+        # Parse this request's own part file so a concurrent upload of the same name can't swap it.
+        stored_path = await documents.store_upload(file)
         try:
-            loaded_documents = documents.load_documents(stored_path)
+            loaded_documents = await asyncio.to_thread(
+                documents.load_documents, stored_path, file.filename
+            )
         except ValueError as error:
             raise HTTPException(status_code=400, detail=str(error)) from error
-        chunks = documents.chunk_documents(loaded_documents)
-        added_chunks += len(chunks)
-        processed_files.append(file.filename)
-        if document_store is None:
-            document_store = FAISS.from_documents(chunks, embeddings)
-        else:
-            document_store.add_documents(chunks)
+        finally:
+            documents.keep_upload(stored_path, file.filename)
+        return await asyncio.to_thread(documents.chunk_documents, loaded_documents)
 
-    if document_store is None:
-        raise HTTPException(status_code=500, detail="Unable to create document store")
+    chunk_batches = await asyncio.gather(*(process_one(file) for file in files))
+    all_chunks: List[Document] = [chunk for batch in chunk_batches for chunk in batch]
+
+    text_embeddings: List[Tuple[str, List[float]]] = []
+    metadatas = [chunk.metadata for chunk in all_chunks]
+    if all_chunks:
+        # Embed every chunk from every file in a single batch rather than once per file.
+        texts = [chunk.page_content for chunk in all_chunks]
+        text_embeddings = list(zip(texts, await asyncio.to_thread(embed_texts, texts)))
+
+    # Read, extend and save the store under one lock so concurrent uploads can't drop each other's chunks.
+    async with _document_store_lock:
+        document_store = vector_store.writable_document_store(stores.document_store)
+        if text_embeddings:
+            if document_store is None:
+                document_store = vector_store.create_quantized_store(text_embeddings, metadatas)
+            else:
+                document_store.add_embeddings(text_embeddings, metadatas=metadatas)
+
+        if document_store is None:
+            raise HTTPException(status_code=500, detail="Unable to create document store")
 
-    stores.document_store = document_store
-    vector_store.save_document_store(document_store)
+        vector_store.save_document_store(document_store)
+        # With USE_MMAP, go back to serving reads from the saved index mapped from disk
+        # instead of keeping this in-RAM copy for the rest of the worker's life.
+        if vector_store.mmap_enabled():
+            document_store = vector_store.load_document_store_cached()
+        stores.document_store = document_store
+        stores.version += 1
 
-    return UploadResponse(success=True, chunks_added=added_chunks, files=processed_files)
+    return UploadResponse(
+        success=True,
+        chunks_added=len(all_chunks),
+        files=[file.filename for file in files],
+    )
 
 
 def _build_documents_context(query: str, stores: Stores) -> List[SourceDocument]:
-    if stores.document_store is None:
-        return []
-    results = stores.document_store.similarity_search_with_score(query, k=5)
-    context: List[SourceDocument] = []
-    for doc, score in results:
-        context.append(
-            SourceDocument(
-                source=doc.metadata.get("source"),
-                content=doc.page_content,
-                score=float(score),
-            )
-        )
-    return context
+    return list(stores.cached_documents_context(query.strip().casefold(), stores.version))
 
 
-def _call_openai(prompt: str, model: str | None = None) -> str:
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+async def _call_openai(prompt: str, model: str | None = None) -> str:
+    if _openai_client is None:
         return (
             "[Simulated response] "
             "Provide the final answer by prioritizing the user feedback over the raw documents."
         )
-    client = OpenAI(api_key=api_key)
     chosen_model = model or os.getenv("OPENAI_MODEL", config.DEFAULT_MODEL)
     # FIXED: Use chat.completions.create (not responses.create); extract content properly
-    response = client.chat.completions.create(
+    response = await _openai_client.chat.completions.create(
         model=chosen_model,
         messages=[{"role": "user", "content": prompt}],
     )
@@ -140,7 +212,7 @@ async def chat(
         history=payload.chat_history,
         user_role=payload.user_role,
     )
-    answer = _call_openai(prompt)
+    answer = await _call_openai(prompt)
     return ChatResponse(
         answer=answer,
         used_documents=documents_context,
@@ -167,11 +239,20 @@ async def submit_feedback(
 # NEW: SPA catch-all for frontend routes (prod-only, after all API routes)
 if os.getenv("ENV") == "production":
     static_path = os.path.join(os.path.dirname(__file__), "..", "static")  # Same as above
-    @app.get("/{full_path:path}", response_class=FileResponse)
-    async def serve_spa(full_path: str):
+    # index.html only changes between deploys, so read it once instead of on every request.
+    _index_path = Path(static_path, "index.html")
+    _INDEX_HTML_BYTES = _index_path.read_bytes() if _index_path.exists() else None
+    _INDEX_HEADERS = {"Cache-Control": "no-cache, must-revalidate"}
+    if _INDEX_HTML_BYTES is not None:
+        _INDEX_HEADERS["ETag"] = f'"{hashlib.md5(_INDEX_HTML_BYTES).hexdigest()}"'
+
+    @app.get("/{full_path:path}", response_class=Response)
+    async def serve_spa(full_path: str, request: Request):
         # Exclude API and upload/feedback routes
         if full_path.startswith(("api/", "upload", "feedback")):
             return None  # Let FastAPI handle these
-        if not os.path.exists(os.path.join(static_path, "index.html")):
+        if _INDEX_HTML_BYTES is None:
             raise HTTPException(status_code=404, detail="Frontend not built")
-        return FileResponse(os.path.join(static_path, "index.html"))
+        if request.headers.get("if-none-match") == _INDEX_HEADERS["ETag"]:
+            return Response(status_code=304, headers=_INDEX_HEADERS)
+        return Response(content=_INDEX_HTML_BYTES, media_type="text/html", headers=_INDEX_HEADERS)
@@ -1,7 +1,12 @@
 import json
+import os
+import re
+import uuid
 from pathlib import Path
 from typing import List
 
+import aiofiles
+from fastapi import UploadFile
 from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader
@@ -15,38 +20,70 @@ text_splitter = RecursiveCharacterTextSplitter(
 )
 
 
-def _load_text_document(path: Path) -> List[Document]:
+def _load_text_document(path: Path, source: str) -> List[Document]:
     text = path.read_text(encoding="utf-8")
-    return [Document(page_content=text, metadata={"source": path.name})]
+    return [Document(page_content=text, metadata={"source": source})]
 
 
-def _load_json_document(path: Path) -> List[Document]:
-    data = json.loads(path.read_text(encoding="utf-8"))
-    if isinstance(data, str):
-        return [Document(page_content=data, metadata={"source": path.name})]
-    if isinstance(data, dict):
-        return [Document(page_content=json.dumps(data, ensure_ascii=False), metadata={"source": path.name})]
-    if isinstance(data, list):
+def _split_json_array(text: str) -> List[str]:
+    """Return the source text of each top-level array item without re-serializing it."""
+    decoder = json.JSONDecoder()
+    whitespace = re.compile(r"\s*")
+    index = whitespace.match(text, text.index("[") + 1).end()
+    items: List[str] = []
+    if text.startswith("]", index):
+        index += 1
+    else:
+        while True:
+            _, end = decoder.raw_decode(text, index)
+            items.append(text[index:end])
+            index = whitespace.match(text, end).end()
+            if text.startswith(",", index):
+                index = whitespace.match(text, index + 1).end()
+            elif text.startswith("]", index):
+                index += 1
+                break
+            else:
+                raise ValueError(f"Invalid JSON array at position {index}")
+    if text[index:].strip():
+        raise ValueError(f"Extra data after JSON array at position {index}")
+    return items
+
+
+def _load_json_document(path: Path, source: str) -> List[Document]:
+    text = path.read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
         return [
-            Document(page_content=json.dumps(item, ensure_ascii=False), metadata={"source": path.name})
-            for item in data
+            Document(page_content=item, metadata={"source": source})
+            for item in _split_json_array(text)
         ]
-    return [Document(page_content=json.dumps(data, ensure_ascii=False), metadata={"source": path.name})]
+    data = json.loads(text)
+    if isinstance(data, str):
+        return [Document(page_content=data, metadata={"source": source})]
+    if isinstance(data, dict):
+        return [Document(page_content=text.strip(), metadata={"source": source})]
+    return [Document(page_content=json.dumps(data, ensure_ascii=False), metadata={"source": source})]
 
 
-def _load_pdf_document(path: Path) -> List[Document]:
+def _load_pdf_document(path: Path, source: str) -> List[Document]:
     loader = PyPDFLoader(str(path))
-    return loader.load()
+    pages = loader.load()
+    for page in pages:
+        # PyPDFLoader records the path it read; point it at where the upload is kept instead.
+        page.metadata["source"] = str(config.UPLOAD_DIR / source)
+    return pages
 
 
-def load_documents(path: Path) -> List[Document]:
-    suffix = path.suffix.lower()
+def load_documents(path: Path, file_name: str | None = None) -> List[Document]:
+    """Load ``path``, using ``file_name`` (default: the path's own name) for type and source."""
+    source = file_name or path.name
+    suffix = Path(source).suffix.lower()
     if suffix in {".txt", ".md"}:
-        return _load_text_document(path)
+        return _load_text_document(path, source)
     if suffix == ".json":
-        return _load_json_document(path)
+        return _load_json_document(path, source)
     if suffix == ".pdf":
-        return _load_pdf_document(path)
+        return _load_pdf_document(path, source)
     raise ValueError(f"Unsupported file type: {suffix}")
 
 
@@ -54,8 +91,25 @@ def chunk_documents(documents: List[Document]) -> List[Document]:
     return text_splitter.split_documents(documents)
 
 
-def store_upload(file_name: str, data: bytes) -> Path:
+UPLOAD_READ_SIZE = 1 << 20
+
+
+async def store_upload(file: UploadFile) -> Path:
+    """Stream an upload into a part file unique to this request and return its path."""
     config.ensure_directories()
+    partial = config.UPLOAD_DIR / f".{file.filename}.{uuid.uuid4().hex}.part"
+    try:
+        async with aiofiles.open(partial, "wb") as handle:
+            while chunk := await file.read(UPLOAD_READ_SIZE):
+                await handle.write(chunk)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    return partial
+
+
+def keep_upload(partial: Path, file_name: str) -> Path:
+    """Move a parsed part file to its permanent name in the upload directory."""
     destination = config.UPLOAD_DIR / file_name
-    destination.write_bytes(data)
+    os.replace(partial, destination)
     return destination
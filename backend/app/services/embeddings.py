@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import List
 
 from langchain_community.embeddings import SentenceTransformerEmbeddings
 
@@ -6,4 +7,18 @@ from langchain_community.embeddings import SentenceTransformerEmbeddings
 @lru_cache(maxsize=1)
 def get_embedding_model() -> SentenceTransformerEmbeddings:
     """Return a shared embedding model instance."""
-    return SentenceTransformerEmbeddings(model_name="all-MiniLM-L6-v2")
+    return SentenceTransformerEmbeddings(
+        model_name="all-MiniLM-L6-v2",
+        encode_kwargs={"normalize_embeddings": True},
+    )
+
+
+EMBED_BATCH_SIZE = 64
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Encode texts in one batched pass through the sentence transformer."""
+    model = get_embedding_model()
+    encode_kwargs = {"batch_size": EMBED_BATCH_SIZE, **model.encode_kwargs}
+    vectors = model.client.encode(texts, convert_to_numpy=True, **encode_kwargs)
+    return vectors.tolist()
@@ -1,7 +1,12 @@
-import json
+import sqlite3
 from dataclasses import dataclass
-from typing import List
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Tuple
+from uuid import UUID
 
+import orjson
 from langchain_core.documents import Document
 from langchain_community.vectorstores import FAISS
 
@@ -11,6 +16,21 @@ from .embeddings import get_embedding_model
 from . import vector_store
 
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    response TEXT NOT NULL,
+    updated_response TEXT NOT NULL,
+    user_role TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+DROP INDEX IF EXISTS idx_feedback_role_created;
+"""
+
+_COLUMNS = "id, query, response, updated_response, user_role, created_at"
+
+
 @dataclass
 class RetrievedFeedback:
     entry: FeedbackEntry
@@ -21,30 +41,75 @@ class RetrievedFeedback:
 class FeedbackRepository:
     def __init__(self) -> None:
         config.ensure_directories()
-        self.log_path = config.FEEDBACK_LOG_PATH
-        self._entries: List[FeedbackEntry] = []
+        self.db_path = config.FEEDBACK_DB_PATH
+        self._connection = self._connect()
         self._store: FAISS | None = None
+        # Bumped on every new entry so cached snippets are never served stale.
+        self.version = 0
+        self._cached_snippets = lru_cache(maxsize=256)(self._snippets)
         self._load()
 
     @property
     def entries(self) -> List[FeedbackEntry]:
-        return list(self._entries)
+        return self._query_entries(f"SELECT {_COLUMNS} FROM feedback ORDER BY created_at")
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def _query_entries(self, sql: str, params: Tuple = ()) -> List[FeedbackEntry]:
+        return [FeedbackEntry(**dict(row)) for row in self._connection.execute(sql, params)]
+
+    @staticmethod
+    def _row(entry: FeedbackEntry) -> Tuple[str, str, str, str, str, str]:
+        return (
+            str(entry.id),
+            entry.query,
+            entry.response,
+            entry.updated_response,
+            entry.user_role,
+            entry.created_at.isoformat(),
+        )
+
+    def _insert(self, entries: Iterable[FeedbackEntry]) -> None:
+        self._connection.execute("BEGIN")
+        try:
+            self._connection.executemany(
+                f"INSERT OR IGNORE INTO feedback ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                (self._row(entry) for entry in entries),
+            )
+        except Exception:
+            self._connection.execute("ROLLBACK")
+            raise
+        self._connection.execute("COMMIT")
+
+    @staticmethod
+    def _read_legacy_log(path: Path) -> List[FeedbackEntry]:
+        if path.suffix == ".jsonl":
+            with path.open("rb") as handle:
+                return [FeedbackEntry(**orjson.loads(line)) for line in handle if line.strip()]
+        return [FeedbackEntry(**raw) for raw in orjson.loads(path.read_bytes())]
+
+    def _migrate_legacy_logs(self) -> None:
+        """Import entries from the older JSON/JSONL logs into the database."""
+        for legacy_path in config.LEGACY_FEEDBACK_LOG_PATHS:
+            if not legacy_path.exists():
+                continue
+            self._insert(self._read_legacy_log(legacy_path))
+            legacy_path.rename(legacy_path.with_name(legacy_path.name + ".migrated"))
 
     def _load(self) -> None:
-        if self.log_path.exists():
-            data = json.loads(self.log_path.read_text(encoding="utf-8"))
-            for raw in data:
-                self._entries.append(FeedbackEntry(**raw))
+        self._migrate_legacy_logs()
         self._store = vector_store.load_feedback_store()
 
-    def _persist(self) -> None:
-        payload = [entry.model_dump() for entry in self._entries]
-        self.log_path.write_text(json.dumps(payload, default=str, indent=2), encoding="utf-8")
-
     def add(self, entry: FeedbackEntry) -> FeedbackEntry:
-        self._entries.append(entry)
-        self._persist()
+        self._insert([entry])
         self._upsert_vector_entry(entry)
+        self.version += 1
         return entry
 
     def _upsert_vector_entry(self, entry: FeedbackEntry) -> None:
@@ -59,7 +124,9 @@ class FeedbackRepository:
         doc = Document(page_content=entry.updated_response, metadata=metadata)
         embeddings = get_embedding_model()
         if self._store is None:
-            self._store = FAISS.from_documents([doc], embeddings)
+            self._store = FAISS.from_documents(
+                [doc], embeddings, distance_strategy=vector_store.DISTANCE_STRATEGY
+            )
         else:
             self._store.add_documents([doc])
         vector_store.save_feedback_store(self._store)
@@ -68,8 +135,17 @@ class FeedbackRepository:
         if self._store is None:
             return []
         results = self._store.similarity_search_with_score(query, k=limit)
+        ranked: List[Tuple[int, float, Document]] = []
+        for doc, score in results:
+            user_role = doc.metadata.get("user_role", "driver")
+            weight = config.ROLE_WEIGHTS.get(user_role, 1)
+            boost = config.ROLE_BOOST.get(user_role, 0.0)
+            similarity = vector_store.similarity(self._store, score)
+            ranked.append((weight, similarity + boost, doc))
+        ranked.sort(key=lambda item: (item[0], item[1]), reverse=True)
+
         retrieved: List[RetrievedFeedback] = []
-        for doc, distance in results:
+        for weight, score, doc in ranked:
             metadata = doc.metadata
             entry_payload = {
                 "query": metadata.get("query", ""),
@@ -78,35 +154,32 @@ class FeedbackRepository:
                 "user_role": metadata.get("user_role", "driver"),
             }
             if metadata.get("id"):
-                entry_payload["id"] = metadata.get("id")
+                entry_payload["id"] = UUID(metadata["id"])
             if metadata.get("created_at"):
-                entry_payload["created_at"] = metadata.get("created_at")
-            entry = FeedbackEntry(**entry_payload)
-            weight = config.ROLE_WEIGHTS.get(entry.user_role, 1)
-            boost = config.ROLE_BOOST.get(entry.user_role, 0.0)
-            similarity = 1.0 / (1.0 + distance)
-            score = similarity + boost
+                entry_payload["created_at"] = datetime.fromisoformat(metadata["created_at"])
+            # Metadata was written by _upsert_vector_entry and the typed fields are converted
+            # above, so skip re-validating it here.
+            entry = FeedbackEntry.model_construct(**entry_payload)
             retrieved.append(RetrievedFeedback(entry=entry, score=score, weight=weight))
-        retrieved.sort(key=lambda item: (item.weight, item.score), reverse=True)
         return retrieved
 
     def as_snippets(self, query: str, limit: int = 5) -> List[FeedbackSnippet]:
-        snippets: List[FeedbackSnippet] = []
-        for item in self.search(query, limit=limit):
-            entry = item.entry
-            snippets.append(
-                FeedbackSnippet(
-                    id=entry.id,
-                    query=entry.query,
-                    response=entry.response,
-                    updated_response=entry.updated_response,
-                    user_role=entry.user_role,
-                    created_at=entry.created_at,
-                    score=item.score,
-                    weight=item.weight,
-                )
+        return list(self._cached_snippets(query.strip().casefold(), limit, self.version))
+
+    def _snippets(self, query: str, limit: int, version: int) -> Tuple[FeedbackSnippet, ...]:
+        return tuple(
+            FeedbackSnippet(
+                id=item.entry.id,
+                query=item.entry.query,
+                response=item.entry.response,
+                updated_response=item.entry.updated_response,
+                user_role=item.entry.user_role,
+                created_at=item.entry.created_at,
+                score=item.score,
+                weight=item.weight,
             )
-        return snippets
+            for item in self.search(query, limit=limit)
+        )
 
 
 def format_feedback_context(snippets: List[FeedbackSnippet]) -> str:
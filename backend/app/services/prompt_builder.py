@@ -1,5 +1,6 @@
 import re
-from typing import Dict, List, Set, Tuple
+from functools import lru_cache
+from typing import AbstractSet, Dict, FrozenSet, List, Optional, Tuple
 
 from ..models import ChatMessage, FeedbackSnippet, SourceDocument
 from .. import config
@@ -13,6 +14,9 @@ SYSTEM_PROMPT = (
 
 QUERY_SIMILARITY_THRESHOLD = 0.2
 DOCUMENT_RELEVANCE_THRESHOLD = 0.1
+FORMAT_CACHE_MIN_SIZE = 2048
+
+_TOKEN_RE = re.compile(r"\b\w+\b")
 
 
 def format_chat_history(history: List[ChatMessage]) -> str:
@@ -25,35 +29,48 @@ def format_chat_history(history: List[ChatMessage]) -> str:
     return "\n".join(formatted)
 
 
-def format_documents(documents: List[SourceDocument]) -> str:
-    if not documents:
-        return "No retrieved documents."
+def _format_documents(entries: Tuple[Tuple[Optional[str], str], ...]) -> str:
     parts: List[str] = []
-    for index, document in enumerate(documents, start=1):
-        source = document.source or f"chunk-{index}"
+    for index, (source, content) in enumerate(entries, start=1):
+        source = source or f"chunk-{index}"
         parts.append(
             "\n".join(
                 [
                     f"Document {index} (source: {source})",
-                    document.content,
+                    content,
                 ]
             )
         )
     return "\n\n".join(parts)
 
 
-def _tokenize(text: str) -> Set[str]:
-    return set(re.findall(r"\b\w+\b", text.casefold()))
+# Repeated queries get the same retrieved documents back, so larger document sets are
+# memoized on their contents; small ones are cheaper to rebuild than to cache.
+_format_documents_cached = lru_cache(maxsize=128)(_format_documents)
+
+
+def format_documents(documents: List[SourceDocument]) -> str:
+    if not documents:
+        return "No retrieved documents."
+    entries = tuple((document.source, document.content) for document in documents)
+    if sum(len(content) for _, content in entries) < FORMAT_CACHE_MIN_SIZE:
+        return _format_documents(entries)
+    return _format_documents_cached(entries)
+
+
+@lru_cache(maxsize=1024)
+def _tokenize(text: str) -> FrozenSet[str]:
+    return frozenset(_TOKEN_RE.findall(text.casefold()))
 
 
-def _jaccard_similarity(first: Set[str], second: Set[str]) -> float:
+def _jaccard_similarity(first: AbstractSet[str], second: AbstractSet[str]) -> float:
     if not first or not second:
         return 0.0
-    intersection = first & second
-    union = first | second
+    intersection = len(first & second)
+    union = len(first) + len(second) - intersection
     if not union:
         return 0.0
-    return len(intersection) / len(union)
+    return intersection / union
 
 
 def _select_applicable_feedback(
@@ -70,24 +87,34 @@ def _select_applicable_feedback(
 
     best_matches: Dict[str, Tuple[FeedbackSnippet, float]] = {}
 
+    # Snippet tokens and query similarity don't depend on the document, so compute them once.
+    snippet_candidates: List[Tuple[FeedbackSnippet, FrozenSet[str], float]] = []
+    for snippet in feedback_snippets:
+        if not snippet.query:
+            continue
+        snippet_tokens = _tokenize(snippet.query)
+        if not snippet_tokens:
+            continue
+        query_similarity = _jaccard_similarity(query_tokens, snippet_tokens)
+        if query_similarity < QUERY_SIMILARITY_THRESHOLD:
+            continue
+        snippet_candidates.append((snippet, snippet_tokens, query_similarity))
+    if not snippet_candidates:
+        return []
+
     for document in documents:
         doc_tokens = _tokenize(document.content)
         if not doc_tokens:
             continue
-        for snippet in feedback_snippets:
-            snippet_id = str(snippet.id)
-            snippet_tokens = _tokenize(snippet.query)
-            if not snippet_tokens:
+        for snippet, snippet_tokens, query_similarity in snippet_candidates:
+            overlap = len(doc_tokens & snippet_tokens)
+            if not overlap:
                 continue
-
-            query_similarity = _jaccard_similarity(query_tokens, snippet_tokens)
-            intersection = doc_tokens & snippet_tokens
-            if not intersection:
-                continue
-            document_relevance = len(intersection) / len(snippet_tokens)
-            if query_similarity < QUERY_SIMILARITY_THRESHOLD or document_relevance < DOCUMENT_RELEVANCE_THRESHOLD:
+            document_relevance = overlap / len(snippet_tokens)
+            if document_relevance < DOCUMENT_RELEVANCE_THRESHOLD:
                 continue
 
+            snippet_id = str(snippet.id)
             combined_score = query_similarity + document_relevance
             existing = best_matches.get(snippet_id)
             if existing is None or combined_score > existing[1]:
@@ -1,34 +1,135 @@
+import os
+import pickle
+import shutil
+import weakref
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 
 from .. import config
 from .embeddings import get_embedding_model
 
+# Embeddings are L2-normalized, so inner product is cosine similarity.
+DISTANCE_STRATEGY = DistanceStrategy.MAX_INNER_PRODUCT
 
-def _load_store(path: Path) -> Optional[FAISS]:
+# Stores whose index codes are memory-mapped; faiss cannot add vectors to these.
+_mapped_stores: "weakref.WeakSet[FAISS]" = weakref.WeakSet()
+
+
+def mmap_enabled() -> bool:
+    return os.getenv("USE_MMAP", "").lower() in {"1", "true", "yes"}
+
+
+def _load_store_mmap(path: Path) -> FAISS:
+    """Load a store with its flat/SQ codes memory-mapped instead of copied into RAM."""
+    index = faiss.read_index(str(path / "index.faiss"), faiss.IO_FLAG_MMAP_IFC)
+    with (path / "index.pkl").open("rb") as handle:
+        docstore, index_to_docstore_id = pickle.load(handle)
+    store = FAISS(
+        embedding_function=get_embedding_model(),
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
+    _mapped_stores.add(store)
+    return store
+
+
+def _load_store(path: Path, mmap: bool = False) -> Optional[FAISS]:
     if not path.exists():
         return None
-    try:
-        return FAISS.load_local(
-            folder_path=str(path),
-            embeddings=get_embedding_model(),
-            allow_dangerous_deserialization=True,
-        )
-    except Exception:
-        return None
+    store: Optional[FAISS] = None
+    if mmap:
+        try:
+            store = _load_store_mmap(path)
+        except Exception:
+            pass  # Fall back to a regular in-memory load.
+    if store is None:
+        try:
+            store = FAISS.load_local(
+                folder_path=str(path),
+                embeddings=get_embedding_model(),
+                allow_dangerous_deserialization=True,
+            )
+        except Exception:
+            return None
+    # The strategy isn't persisted; derive it so indexes saved before the switch to
+    # inner product keep reporting L2 distances.
+    if store.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+        store.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+    else:
+        store.distance_strategy = DistanceStrategy.EUCLIDEAN_DISTANCE
+    return store
+
+
+@lru_cache(maxsize=4)
+def _load_store_cached(path: str) -> Optional[FAISS]:
+    return _load_store(Path(path), mmap=mmap_enabled())
 
 
 def _save_store(store: FAISS, path: Path) -> None:
+    # Write beside the target and swap files in, so a mapped index is never truncated under a reader.
+    staging = path.with_name(path.name + ".tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    store.save_local(str(staging))
     path.mkdir(parents=True, exist_ok=True)
-    store.save_local(str(path))
+    for file in staging.iterdir():
+        os.replace(file, path / file.name)
+    staging.rmdir()
+    _load_store_cached.cache_clear()
+
+
+def similarity(store: FAISS, score: float) -> float:
+    """Convert a raw search score into a similarity where higher is better."""
+    if store.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT:
+        return score
+    return 1.0 / (1.0 + score)
+
+
+def create_quantized_store(
+    text_embeddings: Sequence[Tuple[str, List[float]]],
+    metadatas: Sequence[Dict],
+) -> FAISS:
+    """Build a store whose index keeps vectors as 8-bit scalars over a fixed [-1, 1] range."""
+    dimension = len(text_embeddings[0][1])
+    index = faiss.IndexScalarQuantizer(
+        dimension, faiss.ScalarQuantizer.QT_8bit_uniform, faiss.METRIC_INNER_PRODUCT
+    )
+    # Embeddings are L2-normalized, so every component lies in [-1, 1]. Training on those
+    # bounds instead of the first batch keeps later uploads from being clipped to its range.
+    index.train(np.array([[-1.0] * dimension, [1.0] * dimension], dtype=np.float32))
+    store = FAISS(
+        embedding_function=get_embedding_model(),
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DISTANCE_STRATEGY,
+    )
+    store.add_embeddings(text_embeddings, metadatas=list(metadatas))
+    return store
 
 
 def load_document_store() -> Optional[FAISS]:
     return _load_store(config.VECTOR_STORE_DIR)
 
 
+def load_document_store_cached() -> Optional[FAISS]:
+    return _load_store_cached(str(config.VECTOR_STORE_DIR))
+
+
+def writable_document_store(store: Optional[FAISS]) -> Optional[FAISS]:
+    """Return a store that can accept new vectors; memory-mapped indexes are read-only."""
+    if store is None or store not in _mapped_stores:
+        return store
+    return load_document_store()
+
+
 def save_document_store(store: FAISS) -> None:
     _save_store(store, config.VECTOR_STORE_DIR)
 
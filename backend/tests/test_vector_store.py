@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from app.services import vector_store
+
+DIMENSION = 384
+
+
+@pytest.fixture(autouse=True)
+def fake_embedding_model(monkeypatch):
+    monkeypatch.setattr(
+        vector_store, "get_embedding_model", lambda: DeterministicFakeEmbedding(size=DIMENSION)
+    )
+
+
+def _unit_vectors(count: int) -> np.ndarray:
+    vectors = np.random.default_rng(0).normal(size=(count, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_quantized_store_ranks_vectors_added_after_a_single_chunk_first_upload():
+    vectors = _unit_vectors(5)
+    texts = [f"chunk-{index}" for index in range(len(vectors))]
+
+    store = vector_store.create_quantized_store([(texts[0], vectors[0].tolist())], [{"source": "a.txt"}])
+    store.add_embeddings(
+        [(text, vector.tolist()) for text, vector in zip(texts[1:], vectors[1:])],
+        metadatas=[{"source": "b.txt"} for _ in texts[1:]],
+    )
+
+    for text, vector in zip(texts, vectors):
+        results = store.similarity_search_with_score_by_vector(vector.tolist(), k=len(texts))
+        assert results[0][0].page_content == text
+        assert results[0][1] == pytest.approx(1.0, abs=0.02)
+        assert results[0][1] - results[1][1] > 0.5